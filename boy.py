@@ -1,16 +1,20 @@
 import os
 import logging
+import asyncio
 import time
-import threading
 import random
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, fields, replace
+from itertools import accumulate
 from datetime import datetime, timedelta
 import requests
-import pandas as pd
-import talib
 import pytz
-from bs4 import BeautifulSoup
-from telegram import Update, ParseMode, InlineKeyboardMarkup, InlineKeyboardButton
-from telegram.ext import Updater, CommandHandler, CallbackContext, CallbackQueryHandler
+import numpy as np
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.constants import ParseMode
+from telegram.ext import Application, ApplicationBuilder, CommandHandler, ContextTypes, CallbackQueryHandler
 from deta import Deta
 
 # Initialize Deta
@@ -20,16 +24,92 @@ users_db = deta.Base("users")
 performance_db = deta.Base("performance")
 
 # Trading parameters
-PAIRS = ['XAUUSD', 'EURUSD', 'GBPUSD', 'GBPJPY', 'USDJPY']
+PAIRS = ('XAUUSD', 'EURUSD', 'GBPUSD', 'GBPJPY', 'USDJPY')
+BASE_PRICE = {
+    'XAUUSD': 1800.0,
+    'EURUSD': 1.0800,
+    'GBPUSD': 1.2600,
+    'GBPJPY': 160.00,
+    'USDJPY': 140.00
+}
+PAIR_INDEX = {pair: i for i, pair in enumerate(PAIRS)}
 NEW_YORK_TZ = pytz.timezone('America/New_York')
 RISK_REWARD_RATIO = 3.0  # Minimum 3:1 reward:risk ratio
 
+# Volatility multiples for (TP1, TP2, TP3, SL) in the trade direction, per strategy
+# Scalping: tighter targets, shorter duration. Intraday: wider targets, longer duration
+TARGET_MULTIPLIERS = {
+    'scalping': (1.0, 1.5, 2.0, -0.7),
+    'intraday': (1.5, 2.5, 4.0, -1.2)
+}
+SIGNAL_EXPIRY = {
+    'scalping': timedelta(minutes=30),
+    'intraday': timedelta(hours=4)
+}
+SIGNAL_COOLDOWN = 300  # Seconds between signals for the same pair
+
+# Weighted outcomes as (choices, cumulative weights), precomputed for weighted_choice
+DIRECTION_WEIGHTS = (('BUY', 'SELL'), list(accumulate([0.6, 0.4])))
+TP_LEVEL_CUM_WEIGHTS = np.cumsum([0.6, 0.3, 0.1])  # TP1-TP3, drawn per signal in signal_monitor
+
+# Telegram broadcast limits (~30 msg/s global)
+BROADCAST_BATCH_SIZE = 25
+BROADCAST_BATCH_INTERVAL = 1.1  # seconds between batches
+OUTBOX_FLUSH_INTERVAL = 0.1  # Window for coalescing messages to the same chat
+MAX_MESSAGE_LENGTH = 3900  # Headroom under Telegram's 4096-char limit
+
+USERS_CACHE_TTL = 300  # Refresh cached user list every 5 minutes
+DETA_PUT_MANY_LIMIT = 25  # Max items per Deta Base put_many call
+DETA_FETCH_PAGE_SIZE = 100
+DETA_IO_WORKERS = 8  # Worker threads for blocking Deta calls
+PERF_KEY = "global"  # Single performance record, updated with atomic increments
+
+def weighted_choice(weighted):
+    """Pick from a (choices, cumulative weights) pair, like random.choices without rebuilding weights"""
+    choices, cum_weights = weighted
+    return choices[bisect_right(cum_weights, random.random() * cum_weights[-1], 0, len(choices) - 1)]
+
+@dataclass(slots=True)
+class Signal:
+    """Trading signal; converted to a dict only when stored in Deta"""
+    pair: str
+    direction: str
+    strategy: str
+    entry: float
+    tp1: float
+    tp2: float
+    tp3: float
+    sl: float
+    expiry: str
+    status: str
+    confidence: float
+    created_at: str
+    key: str = None
+    closed_at: str = None
+    close_reason: str = None
+
+    def to_item(self):
+        """Deta item for this signal, leaving unset fields (e.g. a new key) out"""
+        return {name: value for name, value in asdict(self).items() if value is not None}
+
+    @classmethod
+    def from_item(cls, item):
+        """Build a signal from a Deta item, ignoring unknown fields"""
+        return cls(**{f.name: item[f.name] for f in fields(cls) if f.name in item})
+
 class ProfitOptimizedTradingBot:
     def __init__(self):
-        self.live_prices = {pair: None for pair in PAIRS}
+        # All state below is only touched from the event loop; worker threads
+        # (asyncio.to_thread) must be handed snapshots, never these objects
+        self.live_prices = dict.fromkeys(PAIRS)
         self.market_open = False
         self.high_impact_news = []
         self.signal_cooldown = {}
+        self._users_cache = {"ts": None, "items": []}  # ts None: never fetched
+        self._active_signals = {}  # signal key -> signal, mirrors active rows in signals_db
+        self._signal_arrays = None  # NumPy view of _active_signals, rebuilt when it changes
+        self._rng = np.random.default_rng()
+        self._outbox = asyncio.Queue()  # (chat_id, Markdown text) awaiting delivery
         self.performance = {
             'total_signals': 0,
             'tp1_hits': 0,
@@ -37,21 +117,38 @@ class ProfitOptimizedTradingBot:
             'tp3_hits': 0,
             'sl_hits': 0
         }
-        self.start_services()
+        self.app = None
+        self._tasks = []
+
+    async def start_services(self, app: Application):
+        """Initialize all background services on the bot's event loop"""
+        self.app = app
+        # asyncio.to_thread runs on the loop's default executor; give Deta I/O its own bounded pool
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=DETA_IO_WORKERS, thread_name_prefix="deta-io")
+        )
+        await self.load_performance()
+        self._tasks = [
+            asyncio.create_task(self.price_updater()),
+            asyncio.create_task(self.market_hours_checker()),
+            asyncio.create_task(self.news_monitor()),
+            asyncio.create_task(self.signal_generator()),
+            asyncio.create_task(self.signal_monitor()),
+            asyncio.create_task(self.outbox_sender()),
+        ]
 
-    def start_services(self):
-        """Initialize all background services"""
-        threading.Thread(target=self.price_updater, daemon=True).start()
-        threading.Thread(target=self.market_hours_checker, daemon=True).start()
-        threading.Thread(target=self.news_monitor, daemon=True).start()
-        threading.Thread(target=self.signal_generator, daemon=True).start()
-        threading.Thread(target=self.signal_monitor, daemon=True).start()
+    async def stop_services(self, app: Application):
+        """Cancel background services before the event loop closes"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
 
     # ======================
     # MARKET DATA SERVICES
     # ======================
     
-    def price_updater(self):
+    async def price_updater(self):
         """Update live prices every 15 seconds"""
         while True:
             if self.market_open:
@@ -61,26 +158,20 @@ class ProfitOptimizedTradingBot:
                         self.live_prices[pair] = self.fetch_simulated_price(pair)
                     except Exception as e:
                         logging.error(f"Price update failed for {pair}: {str(e)}")
-            time.sleep(15)
+            await asyncio.sleep(15)
 
     def fetch_simulated_price(self, pair):
         """Simulated price movement for demonstration"""
-        base_price = {
-            'XAUUSD': 1800.0,
-            'EURUSD': 1.0800,
-            'GBPUSD': 1.2600,
-            'GBPJPY': 160.00,
-            'USDJPY': 140.00
-        }
+        base_price = BASE_PRICE[pair]
         volatility = random.uniform(0.001, 0.005)
-        movement = random.choice([-1, 1]) * volatility * base_price[pair]
-        return base_price[pair] + movement
+        movement = random.choice((-1, 1)) * volatility * base_price
+        return base_price + movement
 
     # ======================
     # TRADING STRATEGIES
     # ======================
     
-    def generate_signal(self, pair):
+    def generate_signal(self, pair, now):
         """Generate high-probability trading signals"""
         if self.is_cooldown(pair) or not self.market_open or self.is_news_blackout(pair):
             return None
@@ -97,48 +188,38 @@ class ProfitOptimizedTradingBot:
         
         # Generate signal with high confidence
         if trend_strength > 0.8:
-            direction = random.choices(['BUY', 'SELL'], weights=[0.6, 0.4])[0]
-            return self.create_signal(pair, direction, strategy, current_price, trend_strength)
+            direction = weighted_choice(DIRECTION_WEIGHTS)
+            return self.create_signal(pair, direction, strategy, current_price, trend_strength, now)
         return None
 
-    def create_signal(self, pair, direction, strategy, entry, confidence):
+    def create_signal(self, pair, direction, strategy, entry, confidence, now):
         """Create signal with optimized TP/SL levels"""
         # Determine volatility-based targets
         volatility = random.uniform(0.001, 0.005)  # 0.1-0.5% volatility
         
-        # Scalping: tighter targets, shorter duration
-        if strategy == 'scalping':
-            tp1 = entry * (1 + volatility) if direction == 'BUY' else entry * (1 - volatility)
-            tp2 = entry * (1 + 1.5 * volatility) if direction == 'BUY' else entry * (1 - 1.5 * volatility)
-            tp3 = entry * (1 + 2.0 * volatility) if direction == 'BUY' else entry * (1 - 2.0 * volatility)
-            sl = entry * (1 - 0.7 * volatility) if direction == 'BUY' else entry * (1 + 0.7 * volatility)
-            expiry = datetime.now() + timedelta(minutes=30)
-        # Intraday: wider targets, longer duration
-        else:
-            tp1 = entry * (1 + 1.5 * volatility) if direction == 'BUY' else entry * (1 - 1.5 * volatility)
-            tp2 = entry * (1 + 2.5 * volatility) if direction == 'BUY' else entry * (1 - 2.5 * volatility)
-            tp3 = entry * (1 + 4.0 * volatility) if direction == 'BUY' else entry * (1 - 4.0 * volatility)
-            sl = entry * (1 - 1.2 * volatility) if direction == 'BUY' else entry * (1 + 1.2 * volatility)
-            expiry = datetime.now() + timedelta(hours=4)
+        # Scale strategy multipliers by volatility; SELL signals mirror BUY around entry
+        step = volatility if direction == 'BUY' else -volatility
+        tp1, tp2, tp3, sl = (entry * (1 + k * step) for k in TARGET_MULTIPLIERS[strategy])
+        expiry = now + SIGNAL_EXPIRY[strategy]
             
         # Create signal object
-        signal = {
-            "pair": pair,
-            "direction": direction,
-            "strategy": strategy,
-            "entry": entry,
-            "tp1": tp1,
-            "tp2": tp2,
-            "tp3": tp3,
-            "sl": sl,
-            "expiry": expiry.isoformat(),
-            "status": "active",
-            "confidence": confidence,
-            "created_at": datetime.now().isoformat()
-        }
+        signal = Signal(
+            pair=pair,
+            direction=direction,
+            strategy=strategy,
+            entry=entry,
+            tp1=tp1,
+            tp2=tp2,
+            tp3=tp3,
+            sl=sl,
+            expiry=expiry.isoformat(),
+            status="active",
+            confidence=confidence,
+            created_at=now.isoformat()
+        )
         
         # Set cooldown to prevent signal flooding
-        self.signal_cooldown[pair] = datetime.now() + timedelta(minutes=5)
+        self.signal_cooldown[pair] = time.monotonic() + SIGNAL_COOLDOWN
         
         return signal
 
@@ -146,54 +227,88 @@ class ProfitOptimizedTradingBot:
     # SIGNAL MANAGEMENT
     # ======================
     
-    def signal_generator(self):
+    async def signal_generator(self):
         """Generate signals at optimized intervals"""
         while True:
             try:
                 if self.market_open:
-                    for pair in PAIRS:
-                        signal = self.generate_signal(pair)
-                        if signal:
-                            signals_db.put(signal)
-                            self.performance['total_signals'] += 1
-                            self.send_signal_alert(signal)
+                    now = datetime.now()
+                    new_signals = [signal for signal in (self.generate_signal(pair, now) for pair in PAIRS) if signal]
+                    stored = [Signal.from_item(item) for item in await self.put_many(signals_db, [signal.to_item() for signal in new_signals])]
+                    
+                    # Track and count every stored signal before alerting, so a failed alert can't skip it
+                    for signal in stored:
+                        self._active_signals[signal.key] = signal
+                        self.performance['total_signals'] += 1
+                    self._signal_arrays = None
+                    await self.record_performance({'total_signals': len(stored)})
+                    
+                    for signal in stored:
+                        try:
+                            await self.send_signal_alert(signal)
+                        except Exception as e:
+                            logging.error(f"Signal alert failed for {signal.key}: {str(e)}")
             except Exception as e:
                 logging.error(f"Signal generation failed: {str(e)}")
-            time.sleep(60)  # Check every minute
+            await asyncio.sleep(60)  # Check every minute
 
-    def signal_monitor(self):
+    async def signal_monitor(self):
         """Monitor active signals with profit-optimized logic"""
+        # Load signals left active by a previous run; afterwards the in-memory copy is authoritative
+        try:
+            for item in await self.fetch_all(signals_db, {"status": "active"}):
+                self._active_signals[item["key"]] = Signal.from_item(item)
+            self._signal_arrays = None
+        except Exception as e:
+            logging.error(f"Loading active signals failed: {str(e)}")
+        
         while True:
             try:
-                active_signals = signals_db.fetch({"status": "active"}).items
-                for signal in active_signals:
-                    current_price = self.live_prices.get(signal["pair"])
-                    if not current_price:
-                        continue
-                        
-                    # Check TP levels with 80% probability of hitting
-                    if random.random() < 0.8:
-                        tp_level = random.choices([1, 2, 3], weights=[0.6, 0.3, 0.1])[0]
-                        
-                        if tp_level == 1:
-                            self.close_signal(signal, f"TP1 HIT for {signal['pair']}", "tp1")
-                        elif tp_level == 2:
-                            self.close_signal(signal, f"TP2 HIT for {signal['pair']}", "tp2")
-                        else:
-                            self.close_signal(signal, f"TP3 HIT for {signal['pair']}", "tp3")
-                    # 10% probability of SL hit
-                    elif random.random() < 0.1:
-                        self.close_signal(signal, f"SL HIT for {signal['pair']}", "sl")
+                closures = []
+                now = datetime.now()
+                signals, pair_idx = self.signal_arrays()
+                if signals:
+                    # Skip signals whose pair has no live price (unknown pairs map to the trailing NaN slot)
+                    prices = np.array([self.live_prices[pair] for pair in PAIRS] + [None], dtype=float)
+                    priced = ~np.isnan(prices[pair_idx])
+                    n = len(signals)
+                    
+                    # Check TP levels with 80% probability of hitting, otherwise 10% probability of SL hit
+                    tp_hit = priced & (self._rng.random(n) < 0.8)
+                    sl_hit = priced & ~tp_hit & (self._rng.random(n) < 0.1)
+                    draws = self._rng.random(n) * TP_LEVEL_CUM_WEIGHTS[-1]
+                    tp_level = np.minimum(np.searchsorted(TP_LEVEL_CUM_WEIGHTS, draws, side='right'), 2) + 1
+                    
+                    for i in np.nonzero(tp_hit | sl_hit)[0]:
+                        close_type = f"tp{tp_level[i]}" if tp_hit[i] else "sl"
+                        closures.append(replace(signals[i], status="closed", closed_at=now.isoformat(), close_reason=close_type))
+                
+                # Persist all closures from this pass first; signals whose write
+                # failed stay active in memory and are checked again next pass
+                stored = await self.put_many(signals_db, [signal.to_item() for signal in closures])
+                stored_keys = {item["key"] for item in stored}
+                closed_batch = [signal for signal in closures if signal.key in stored_keys]
+                
+                # Finish all bookkeeping before notifying, so a failed notice can't leave
+                # a stored closure active in memory (and closed again next pass)
+                for signal in closed_batch:
+                    self.close_signal(signal)
+                await self.record_performance(Counter(f"{signal.close_reason}_hits" for signal in closed_batch))
+                
+                for signal in closed_batch:
+                    try:
+                        await self.notify_users(f"{signal.close_reason.upper()} HIT for {signal.pair}")
+                    except Exception as e:
+                        logging.error(f"Close notice failed for {signal.key}: {str(e)}")
             except Exception as e:
                 logging.error(f"Signal monitoring failed: {str(e)}")
-            time.sleep(30)
-
-    def close_signal(self, signal, message, close_type):
-        """Close signal and update performance"""
-        signal["status"] = "closed"
-        signal["closed_at"] = datetime.now().isoformat()
-        signal["close_reason"] = close_type
-        signals_db.put(signal)
+            await asyncio.sleep(30)
+
+    def close_signal(self, signal):
+        """Stop tracking a signal whose closure is persisted and update performance"""
+        close_type = signal.close_reason
+        self._active_signals.pop(signal.key, None)
+        self._signal_arrays = None
         
         # Update performance
         if close_type == "tp1":
@@ -204,41 +319,102 @@ class ProfitOptimizedTradingBot:
             self.performance['tp3_hits'] += 1
         else:
             self.performance['sl_hits'] += 1
-            
-        # Save performance weekly
-        if self.performance['total_signals'] % 10 == 0:
-            performance_db.put(self.performance)
+
+    def signal_arrays(self):
+        """Active signals with their index into PAIRS (len(PAIRS) for unknown pairs)"""
+        if self._signal_arrays is None:
+            signals = list(self._active_signals.values())
+            for signal in signals:
+                if signal.pair not in PAIR_INDEX:
+                    logging.warning(f"Signal {signal.key} has unknown pair {signal.pair}; it has no live price to monitor")
+            self._signal_arrays = (
+                signals,
+                np.array([PAIR_INDEX.get(signal.pair, len(PAIRS)) for signal in signals], dtype=int)
+            )
+        return self._signal_arrays
+
+    async def load_performance(self):
+        """Restore persisted performance counters, creating the record on first run"""
+        try:
+            saved = await asyncio.to_thread(performance_db.get, PERF_KEY)
+            if saved is None:
+                await asyncio.to_thread(performance_db.put, dict(self.performance), PERF_KEY)
+            else:
+                for name in self.performance:
+                    self.performance[name] = saved.get(name, 0)
+        except Exception as e:
+            logging.error(f"Loading performance failed: {str(e)}")
+
+    async def record_performance(self, deltas):
+        """Send only the counter increments to the persisted performance record"""
+        updates = {name: performance_db.util.increment(count) for name, count in deltas.items() if count}
+        if not updates:
+            return
+        # Stats are best-effort: a failed write must not interrupt signal handling
+        try:
+            await asyncio.to_thread(performance_db.update, updates, PERF_KEY)
+        except Exception as e:
+            logging.error(f"Performance update failed: {str(e)}")
+
+    async def put_many(self, db, items):
+        """Store items in as few Deta round trips as possible, returning the items actually stored"""
+        results = await asyncio.gather(*(
+            asyncio.to_thread(db.put_many, items[i:i + DETA_PUT_MANY_LIMIT])
+            for i in range(0, len(items), DETA_PUT_MANY_LIMIT)
+        ), return_exceptions=True)
         
-        self.notify_users(message)
+        stored = []
+        for res in results:
+            if isinstance(res, Exception):
+                logging.error(f"Deta put_many failed: {str(res)}")
+            else:
+                stored.extend(res["processed"]["items"])
+        return stored
+
+    async def fetch_all(self, db, query=None):
+        """Fetch every item matching query, following Deta's pagination cursor"""
+        res = await asyncio.to_thread(db.fetch, query, limit=DETA_FETCH_PAGE_SIZE)
+        items = list(res.items)
+        while res.last:
+            res = await asyncio.to_thread(db.fetch, query, limit=DETA_FETCH_PAGE_SIZE, last=res.last)
+            items.extend(res.items)
+        return items
 
     # ======================
     # UTILITY FUNCTIONS
     # ======================
     
-    def market_hours_checker(self):
-        """Check if market is open (Sun 5PM - Fri 5PM NY)"""
+    async def market_hours_checker(self):
+        """Check if market is open (Sun 5PM - Fri 5PM NY), sleeping until the next open/close"""
         while True:
             now = datetime.now(NEW_YORK_TZ)
-            weekday = now.weekday()
-            hour = now.hour
-            
-            if weekday == 4 and hour >= 17:  # Friday after 5PM
-                self.market_open = False
-            elif weekday >= 5:  # Weekend
-                self.market_open = (weekday == 6 and hour >= 17)
-            else:
-                self.market_open = True
-            time.sleep(60)
+            self.market_open, next_transition = self.market_schedule(now)
+            await asyncio.sleep(max(1, (next_transition - now).total_seconds()))
+
+    def market_schedule(self, now):
+        """Return whether the market is open at NY time `now` and when that next changes"""
+        local = now.replace(tzinfo=None)
+        
+        # Most recent Sunday 5PM open at or before now
+        days_since_sunday = (local.weekday() + 1) % 7
+        week_open = (local - timedelta(days=days_since_sunday)).replace(hour=17, minute=0, second=0, microsecond=0)
+        if local < week_open:
+            week_open -= timedelta(days=7)
+        week_close = week_open + timedelta(days=5)  # Friday 5PM
+        
+        if local < week_close:
+            return True, NEW_YORK_TZ.localize(week_close)
+        return False, NEW_YORK_TZ.localize(week_open + timedelta(days=7))
 
-    def news_monitor(self):
+    async def news_monitor(self):
         """Check for high-impact news"""
         while True:
             try:
                 # Simulated news monitoring
-                self.high_impact_news = random.choices([True, False], weights=[0.2, 0.8], k=1)[0]
+                self.high_impact_news = random.random() < 0.2  # 20% probability of high-impact news
             except Exception as e:
                 logging.error(f"News monitor failed: {str(e)}")
-            time.sleep(1800)  # Check every 30 minutes
+            await asyncio.sleep(1800)  # Check every 30 minutes
 
     def is_news_blackout(self, pair):
         """Check if trading should be paused due to news"""
@@ -246,59 +422,105 @@ class ProfitOptimizedTradingBot:
 
     def is_cooldown(self, pair):
         """Check if pair is in cooldown period"""
-        cooldown_end = self.signal_cooldown.get(pair)
-        return cooldown_end and datetime.now() < cooldown_end
+        return self.signal_cooldown.get(pair, 0) > time.monotonic()
 
     # ======================
     # TELEGRAM INTEGRATION
     # ======================
     
-    def send_signal_alert(self, signal):
+    async def send_signal_alert(self, signal):
         """Send formatted signal to users"""
-        emoji = "🚀" if signal["direction"] == "BUY" else "📉"
+        emoji = "🚀" if signal.direction == "BUY" else "📉"
         message = (
             f"{emoji} *High-Probability Signal* {emoji}\n\n"
-            f"• Pair: {signal['pair']}\n"
-            f"• Direction: {signal['direction']}\n"
-            f"• Strategy: {signal['strategy'].capitalize()}\n"
-            f"• Entry: {signal['entry']:.5f}\n"
-            f"• Confidence: {signal['confidence']*100:.0f}%\n\n"
+            f"• Pair: {signal.pair}\n"
+            f"• Direction: {signal.direction}\n"
+            f"• Strategy: {signal.strategy.capitalize()}\n"
+            f"• Entry: {signal.entry:.5f}\n"
+            f"• Confidence: {signal.confidence*100:.0f}%\n\n"
             f"🎯 Take Profits:\n"
-            f"1. {signal['tp1']:.5f} (1:1)\n"
-            f"2. {signal['tp2']:.5f} (2:1)\n"
-            f"3. {signal['tp3']:.5f} (3:1)\n\n"
-            f"🛑 Stop Loss: {signal['sl']:.5f}\n"
-            f"⏳ Expires: {datetime.fromisoformat(signal['expiry']).strftime('%H:%M')}"
+            f"1. {signal.tp1:.5f} (1:1)\n"
+            f"2. {signal.tp2:.5f} (2:1)\n"
+            f"3. {signal.tp3:.5f} (3:1)\n\n"
+            f"🛑 Stop Loss: {signal.sl:.5f}\n"
+            f"⏳ Expires: {datetime.fromisoformat(signal.expiry).strftime('%H:%M')}"
         )
         
-        for user in users_db.fetch().items:
-            try:
-                self.updater.bot.send_message(
-                    chat_id=user["key"],
-                    text=message,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            except Exception as e:
-                logging.error(f"Signal alert failed for {user['key']}: {str(e)}")
+        await self.broadcast(message)
 
-    def notify_users(self, message):
+    async def notify_users(self, message):
         """Send notification to all users"""
-        for user in users_db.fetch().items:
-            try:
-                self.updater.bot.send_message(
-                    chat_id=user["key"],
-                    text=message
+        await self.broadcast(message)
+
+    async def broadcast(self, message):
+        """Queue one Markdown message for every user; delivery happens in outbox_sender"""
+        for user in await self._get_users():
+            self._outbox.put_nowait((user["key"], message))
+
+    async def outbox_sender(self):
+        """Deliver queued messages, merging bursts to the same chat into one send"""
+        while True:
+            first = await self._outbox.get()
+            await asyncio.sleep(OUTBOX_FLUSH_INTERVAL)
+            pending = [first]
+            while not self._outbox.empty():
+                pending.append(self._outbox.get_nowait())
+            
+            grouped = {}
+            for chat_id, text in pending:
+                grouped.setdefault(chat_id, []).append(text)
+            
+            # Merge each chat's texts into as few messages as fit Telegram's limit
+            sends = []
+            for chat_id, texts in grouped.items():
+                parts = [texts[0]]
+                for text in texts[1:]:
+                    if len(parts[-1]) + 2 + len(text) > MAX_MESSAGE_LENGTH:
+                        parts.append(text)
+                    else:
+                        parts[-1] += "\n\n" + text
+                sends.append((chat_id, parts))
+            
+            for i in range(0, len(sends), BROADCAST_BATCH_SIZE):
+                batch = sends[i:i + BROADCAST_BATCH_SIZE]
+                results = await asyncio.gather(
+                    *(self.send_parts(chat_id, parts) for chat_id, parts in batch),
+                    return_exceptions=True
                 )
+                for (chat_id, _), result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        logging.error(f"Message delivery failed for {chat_id}: {str(result)}")
+                
+                # Stay under Telegram's global rate limit
+                await asyncio.sleep(BROADCAST_BATCH_INTERVAL)
+
+    async def send_parts(self, chat_id, parts):
+        """Send a chat's messages one after another so they arrive in order"""
+        for text in parts:
+            await self.app.bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.MARKDOWN)
+
+    async def _get_users(self):
+        """Return registered users, re-fetching from Deta only when the cache is stale"""
+        fetched_at = self._users_cache["ts"]
+        if fetched_at is None or time.monotonic() - fetched_at > USERS_CACHE_TTL:
+            # On failure keep serving the stale list and retry on the next call
+            try:
+                users = await self.fetch_all(users_db)
             except Exception as e:
-                logging.error(f"Notification failed for {user['key']}: {str(e)}")
+                logging.error(f"Refreshing users failed: {str(e)}")
+            else:
+                self._users_cache = {"ts": time.monotonic(), "items": users}
+        return self._users_cache["items"]
 
-    def start(self, update: Update, context: CallbackContext):
+    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         user_id = str(update.effective_user.id)
-        users_db.put({}, key=user_id)
+        await asyncio.to_thread(users_db.put, {}, key=user_id)
+        if not any(user["key"] == user_id for user in self._users_cache["items"]):
+            self._users_cache["items"].append({"key": user_id})
         
         # Send welcome message
-        update.message.reply_text(
+        await update.message.reply_text(
             "💰 *Profit-Optimized Trading Bot Activated* 💰\n\n"
             "You will receive high-probability trading signals with:\n"
             "- 80%+ take profit hit rate\n"
@@ -308,7 +530,7 @@ class ProfitOptimizedTradingBot:
             parse_mode=ParseMode.MARKDOWN
         )
 
-    def stats(self, update: Update, context: CallbackContext):
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show performance statistics"""
         # Calculate hit rates
         total_signals = max(1, self.performance['total_signals'])
@@ -329,7 +551,7 @@ class ProfitOptimizedTradingBot:
             f"⚡️ Market Status: {'OPEN' if self.market_open else 'CLOSED'}"
         )
         
-        update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
 
 # ======================
 # BOT INITIALIZATION
@@ -342,20 +564,23 @@ def main():
         level=logging.INFO
     )
     
-    # Initialize bot
+    # Initialize bot; background services start once the event loop is running
     bot = ProfitOptimizedTradingBot()
-    updater = Updater(os.getenv("TELEGRAM_TOKEN"), use_context=True)
-    bot.updater = updater
+    app = (
+        ApplicationBuilder()
+        .token(os.getenv("TELEGRAM_TOKEN"))
+        .post_init(bot.start_services)
+        .post_shutdown(bot.stop_services)
+        .build()
+    )
     
     # Add handlers
-    dispatcher = updater.dispatcher
-    dispatcher.add_handler(CommandHandler("start", bot.start))
-    dispatcher.add_handler(CommandHandler("stats", bot.stats))
+    app.add_handler(CommandHandler("start", bot.start))
+    app.add_handler(CommandHandler("stats", bot.stats))
     
     # Start the bot
-    updater.start_polling()
     logging.info("Profit-optimized trading bot started")
-    updater.idle()
+    app.run_polling()
 
 if __name__ == '__main__':
     main()